@@ -1,26 +1,31 @@
+import atexit
 import time
 import discord
 from discord import app_commands
 from discord.ext import commands
-import bleach
 import datetime
 import os
 import textwrap
 import io
+import gzip
 import contextlib
+import codecs
 import traceback
 import json
 import mimetypes
+import urllib.parse
 import sys
+import threading
 import functools
+import hashlib
 import dataclasses
 import sqlite3
 import asyncio
-import aiohttp  # used for fetching logs in the search command
 import openai
 import httpx
 import tracemalloc
-from collections import deque
+from collections import OrderedDict, deque
+from collections.abc import Callable
 from dotenv import load_dotenv
 
 # Load variables from a modmail.env file so tokens and API keys can be configured externally
@@ -509,7 +514,7 @@ class ConfigSetupView(discord.ui.View):
             config_data = json.load(config_file)
         config_data.update(self.draft)
         with open('config.json', 'w', encoding='utf-8') as config_file:
-            json.dump(config_data, config_file, ensure_ascii=False, indent=2)
+            config_file.write(json.dumps(config_data, ensure_ascii=False, indent=2))
         config.update(normalise_config_keys(config_data))
         config.token = os.getenv('DISCORD_TOKEN', config.token)
         self.debug_log('Config draft persisted successfully.')
@@ -834,16 +839,18 @@ class Config:
     close_message: str
     anonymous_tickets: bool
     send_with_command_only: bool
-    channel_ids: [] = dataclasses.field(init=False)
+    channel_ids: frozenset[int] = dataclasses.field(init=False)
 
 
     def __post_init__(self):
-        self.channel_ids = [self.log_channel_id, self.error_channel_id]
+        self.channel_ids = frozenset((self.log_channel_id, self.error_channel_id))
 
     def update(self, new: dict):
         for key, value in new.items():
             setattr(self, key, value)
-        self.channel_ids = [self.log_channel_id, self.error_channel_id]
+        self.channel_ids = frozenset((self.log_channel_id, self.error_channel_id))
+        invalidate_modmail_forum_ids()
+        invalidate_role_positions()
 
 
 
@@ -1025,21 +1032,161 @@ def clean_guard_markers(text: str) -> str:
     cleaned = text.replace(PROMPT_GUARD_START, '').replace(PROMPT_GUARD_END, '')
     return cleaned.strip()
 
-try:
-    with open('snippets.json', 'r', encoding='utf-8') as snippets_file:
-        snippets = json.load(snippets_file)
-except FileNotFoundError:
-    snippets = {}
-    with open('snippets.json', 'w', encoding='utf-8') as snippets_file:
-        json.dump(snippets, snippets_file, ensure_ascii=False)
 
-try:
-    with open('blacklist.json', 'r', encoding='utf-8') as blacklist_file:
-        blacklist_list = json.load(blacklist_file)
-except FileNotFoundError:
-    blacklist = []
-    with open('blacklist.json', 'w', encoding='utf-8') as blacklist_file:
-        json.dump(blacklist, blacklist_file, ensure_ascii=False)
+# Performance: blocking file helpers run through asyncio.to_thread so disk I/O never stalls the event loop.
+def _read_json(path: str) -> object:
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def _replace_file(path: str, text: str) -> None:
+    # Write to a temporary file and swap it in so a crash never leaves a half-written file behind.
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        file.write(text)
+    os.replace(temp_path, path)
+
+
+# Performance: coalesce bursts of snippet and blacklist edits into a single file write.
+class DebouncedJsonWriter:
+    """Persist a JSON snapshot once edits to the underlying data have settled."""
+
+    def __init__(self, path: str, snapshot: Callable[[], object], *, delay: float = 1.0) -> None:
+        self.path = path
+        self.snapshot = snapshot
+        self.delay = delay
+        self.last_change_at = 0.0
+        self.dirty = False
+        # The text last written by the bot, so a flush that would rewrite identical contents is skipped.
+        self._written_text: str | None = None
+        self._task: asyncio.Task | None = None
+
+    def schedule(self) -> None:
+        """Mark the data as changed and write it after `delay` seconds without further edits."""
+
+        self.last_change_at = time.monotonic()
+        self.dirty = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_soon())
+
+    async def _flush_soon(self) -> None:
+        while self.dirty:
+            await asyncio.sleep(self.delay)
+            if time.monotonic() - self.last_change_at < self.delay:
+                continue
+            self.dirty = False
+            await asyncio.to_thread(self._write, self.snapshot())
+
+    def _write(self, data: object) -> bool:
+        """Write data to the file, returning False when the file already holds exactly that."""
+
+        # Performance: serialise to one string first; json.dump issues a separate write for every chunk.
+        text = json.dumps(data, ensure_ascii=False)
+        if text == self._written_text:
+            return False
+        _replace_file(self.path, text)
+        self._written_text = text
+        return True
+
+    def flush_sync(self) -> None:
+        """Write any pending changes immediately; used when the bot shuts down."""
+
+        if self.dirty:
+            self.dirty = False
+            self._write(self.snapshot())
+
+
+class JsonStore(DebouncedJsonWriter):
+    """An in-memory copy of a JSON file that is re-read only when the file changes on disk."""
+
+    # Performance: stat the file at most this often so hot lookups almost never touch the disk.
+    RELOAD_CHECK_SECONDS = 1.0
+
+    def __init__(
+        self,
+        path: str,
+        default: object,
+        *,
+        load: Callable[[object], object] = lambda data: data,
+        dump: Callable[[object], object] = lambda data: data,
+        delay: float = 1.0
+    ) -> None:
+        super().__init__(path, lambda: dump(self.data), delay=delay)
+        self._load = load
+        # Bumped on every change so derived caches know when to rebuild.
+        self.version = 0
+        self._mtime_ns: int | None = None
+        self._checked_at = time.monotonic()
+        try:
+            self._reload()
+        except FileNotFoundError:
+            self.data = load(default)
+            self._write(default)
+
+    def _reload(self) -> None:
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        self.data = self._load(_read_json(self.path))
+        self._mtime_ns = mtime_ns
+        # The file now holds someone else's edit, so the next write must not be skipped.
+        self._written_text = None
+        self.version += 1
+
+    def _write(self, data: object) -> bool:
+        written = super()._write(data)
+        if written:
+            self._mtime_ns = os.stat(self.path).st_mtime_ns
+        return written
+
+    def get(self):
+        """Return the data, re-reading the file first if it was edited outside the bot."""
+
+        now = time.monotonic()
+        if not self.dirty and now - self._checked_at >= self.RELOAD_CHECK_SECONDS:
+            self._checked_at = now
+            try:
+                if os.stat(self.path).st_mtime_ns != self._mtime_ns:
+                    self._reload()
+            except (OSError, ValueError):
+                pass
+        return self.data
+
+    def set(self, data: object) -> None:
+        """Replace the data and schedule a write."""
+
+        self.data = data
+        self.changed()
+
+    def changed(self) -> None:
+        """Record an in-place edit of the data and schedule a write."""
+
+        self.version += 1
+        self.schedule()
+
+
+snippets_store = JsonStore('snippets.json', {}, dump=dict)
+# Performance: keep the blacklist as a set so the check on every inbound DM is O(1) and edits happen in place.
+blacklist_store = JsonStore('blacklist.json', [], load=set, dump=sorted)
+atexit.register(snippets_store.flush_sync)
+atexit.register(blacklist_store.flush_sync)
+
+
+def _snippet_preview(content: str) -> str:
+    return f'{content[:100]}...' if len(content) > 103 else content
+
+
+# Performance: keep the truncated previews for `snippet view` until the snippets change.
+_snippet_display: dict[str, str] = {}
+_snippet_display_version = -1
+
+
+def get_snippet_previews() -> dict[str, str]:
+    global _snippet_display, _snippet_display_version
+
+    snippets = snippets_store.get()
+    if _snippet_display_version != snippets_store.version:
+        _snippet_display = {name: _snippet_preview(content) for name, content in snippets.items()}
+        _snippet_display_version = snippets_store.version
+    return _snippet_display
 
 # Feature: configurable help options let users route new tickets to the right helpers automatically.
 HELP_OPTIONS_FILE = 'help_options.json'
@@ -1102,7 +1249,7 @@ async def record_help_option_prompt(
             'language': language
         }
         with open(HELP_OPTION_PROMPTS_FILE, 'w', encoding='utf-8') as prompt_file:
-            json.dump(help_option_prompt_records, prompt_file, ensure_ascii=False, indent=2)
+            prompt_file.write(json.dumps(help_option_prompt_records, ensure_ascii=False, indent=2))
 
 
 async def clear_help_option_prompt_record(message_id: int) -> None:
@@ -1114,7 +1261,7 @@ async def clear_help_option_prompt_record(message_id: int) -> None:
             return
         del help_option_prompt_records[key]
         with open(HELP_OPTION_PROMPTS_FILE, 'w', encoding='utf-8') as prompt_file:
-            json.dump(help_option_prompt_records, prompt_file, ensure_ascii=False, indent=2)
+            prompt_file.write(json.dumps(help_option_prompt_records, ensure_ascii=False, indent=2))
 
 
 def _load_translation_cache() -> dict[str, dict[str, str]]:
@@ -1183,7 +1330,7 @@ async def cache_translation(text: str, language: str | None, translation: str) -
         stored = translation_cache.setdefault(text, {})
         stored[language_key] = translation
         with open(TRANSLATIONS_FILE, 'w', encoding='utf-8') as translation_file:
-            json.dump(translation_cache, translation_file, ensure_ascii=False, indent=2)
+            translation_file.write(json.dumps(translation_cache, ensure_ascii=False, indent=2))
 
 
 # Feature: let moderators clear translations that no longer apply so cache entries stay relevant.
@@ -1203,7 +1350,7 @@ async def remove_cached_translation(text: str, language: str | None) -> bool:
         if not stored:
             del translation_cache[text]
         with open(TRANSLATIONS_FILE, 'w', encoding='utf-8') as translation_file:
-            json.dump(translation_cache, translation_file, ensure_ascii=False, indent=2)
+            translation_file.write(json.dumps(translation_cache, ensure_ascii=False, indent=2))
     return True
 
 
@@ -1348,34 +1495,218 @@ except FileNotFoundError:
 
 
 def save_help_options() -> None:
+    invalidate_modmail_forum_ids()
     with open(HELP_OPTIONS_FILE, 'w', encoding='utf-8') as help_options_file:
-        json.dump({name: option.to_json() for name, option in help_options.items()}, help_options_file, ensure_ascii=False)
-
-with sqlite3.connect('logs.db') as connection:
+        help_options_file.write(json.dumps({name: option.to_json() for name, option in help_options.items()}, ensure_ascii=False))
+
+class SQLiteStore:
+    """Long-lived SQLite connections shared by every command, queried from worker threads."""
+
+    def __init__(self, path: str):
+        self.path = path
+        # The connection is used from asyncio.to_thread workers, so access is serialised with a lock.
+        # Performance: every query is a fixed SQL string, so a larger statement cache means none is re-parsed.
+        self.connection = sqlite3.connect(path, check_same_thread=False, cached_statements=256)
+        self.lock = threading.Lock()
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        # SQLite's default, pinned so the WAL file is folded back into the database every ~4 MB of writes.
+        self.connection.execute('PRAGMA wal_autocheckpoint=1000')
+        self._configure(self.connection)
+        # Performance: WAL lets readers run alongside the writer, so lookups get their own read-only
+        # connection and never queue behind a transcript insert or a ticket write batch.
+        self.reader = sqlite3.connect(f'file:{path}?mode=ro', uri=True, check_same_thread=False, cached_statements=256)
+        self.reader_lock = threading.Lock()
+        self._configure(self.reader)
+
+    @staticmethod
+    def _configure(connection: sqlite3.Connection) -> None:
+        connection.execute('PRAGMA temp_store=MEMORY')
+        # Roughly 20 MB of page cache and a 256 MB memory map keep hot pages out of the read() path.
+        connection.execute('PRAGMA cache_size=-20000')
+        connection.execute('PRAGMA mmap_size=268435456')
+
+    def _transaction(self, func: Callable[[sqlite3.Connection], object]) -> object:
+        with self.lock, self.connection:
+            return func(self.connection)
+
+    def _read(self, sql: str, parameters: tuple, fetch: str) -> object:
+        with self.reader_lock:
+            return getattr(self.reader.execute(sql, parameters), fetch)()
+
+    async def run(self, func: Callable[[sqlite3.Connection], object]) -> object:
+        """Run func with the connection inside a single transaction."""
+
+        return await asyncio.to_thread(self._transaction, func)
+
+    async def execute(self, sql: str, parameters: tuple = ()) -> None:
+        await self.run(lambda conn: conn.execute(sql, parameters))
+
+    async def fetchone(self, sql: str, parameters: tuple = ()) -> tuple | None:
+        return await asyncio.to_thread(self._read, sql, parameters, 'fetchone')
+
+    async def fetchall(self, sql: str, parameters: tuple = ()) -> list[tuple]:
+        return await asyncio.to_thread(self._read, sql, parameters, 'fetchall')
+
+    def close(self) -> None:
+        """Close the connections once any in-flight query has finished."""
+
+        with self.reader_lock:
+            self.reader.close()
+        with self.lock:
+            self.connection.close()
+
+
+# Performance: open each database once with WAL journaling instead of reconnecting for every query.
+logs_db = SQLiteStore('logs.db')
+tickets_db = SQLiteStore('tickets.db')
+atexit.register(logs_db.close)
+atexit.register(tickets_db.close)
+
+with logs_db.connection as connection:
     cursor = connection.cursor()
-    cursor.execute('CREATE TABLE IF NOT EXISTS logs (user_id, timestamp, txt_log_url, htm_log_url)')
-    connection.commit()
+    cursor.execute(
+        'CREATE TABLE IF NOT EXISTS logs (user_id INTEGER, timestamp INTEGER, txt_log_url TEXT, htm_log_url TEXT)'
+    )
+    # Performance: !search looks logs up by user, newest first, so seek the index instead of scanning and sorting.
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_user_timestamp ON logs(user_id, timestamp)')
+    # Feature: index closed transcripts locally so !search matches text without downloading every log.
+    # The trigram tokenizer keeps substring semantics; builds without FTS5 fall back to downloading logs.
+    # Each row shares its rowid with the logs row it indexes, so searches filter by user through
+    # idx_logs_user_timestamp and only touch that user's transcripts. logs has no INTEGER PRIMARY KEY,
+    # so VACUUM may renumber its rowids; the stored URL is checked in every join so a drifted row is
+    # treated as unindexed (and downloaded) rather than matched against another ticket's text.
+    try:
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS log_fts USING fts5(body, txt_log_url UNINDEXED, tokenize='trigram')"
+        )
+        LOG_SEARCH_INDEX_AVAILABLE = True
+    except sqlite3.OperationalError:
+        LOG_SEARCH_INDEX_AVAILABLE = False
+
+
+def build_fts_phrase(term: str) -> str:
+    """Quote a search term as an FTS5 phrase so user input is never parsed as query syntax."""
 
+    return '"' + term.replace('"', '""') + '"'
 
-with sqlite3.connect('tickets.db') as connection:
+
+with tickets_db.connection as connection:
     cursor = connection.cursor()
-    cursor.execute('CREATE TABLE IF NOT EXISTS tickets (user_id, channel_id)')
+    # Integer affinity only applies to newly created databases; existing tables keep their original schema.
+    cursor.execute('CREATE TABLE IF NOT EXISTS tickets (user_id INTEGER, channel_id INTEGER)')
+    # Performance: replies, closes and group commands look tickets up by their thread ID.
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_channel_id ON tickets(channel_id)')
+    # Performance: incoming DMs and !send look tickets up by the user's ID.
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_user_id ON tickets(user_id)')
     # Feature: track which tickets are part of a multi-user group tag so bulk commands can target them later.
     cursor.execute(
         'CREATE TABLE IF NOT EXISTS group_tags ('
         'group_name TEXT COLLATE NOCASE, thread_id INTEGER, PRIMARY KEY (group_name, thread_id))'
     )
     cursor.execute('CREATE INDEX IF NOT EXISTS idx_group_thread ON group_tags(thread_id)')
-    connection.commit()
+    # Performance: the anonymous ticket counter lives in a one-row table so each increment is a single atomic update.
+    cursor.execute('CREATE TABLE IF NOT EXISTS ticket_counter (id INTEGER PRIMARY KEY, value INTEGER NOT NULL)')
+    if cursor.execute('SELECT 1 FROM ticket_counter WHERE id = 0').fetchone() is None:
+        # Carry on from the old counter.txt file when upgrading.
+        try:
+            with open('counter.txt', 'r') as counter_file:
+                legacy_counter = int(counter_file.read())
+        except (ValueError, OSError):
+            legacy_counter = 0
+        cursor.execute('INSERT INTO ticket_counter VALUES (0, ?)', (legacy_counter,))
+
+# Performance: mirror the user <-> thread mapping in memory; it only changes when tickets open or close.
+_user_to_channel: dict[int, int] = {}
+_channel_to_user: dict[int, int] = {}
+for _user_id, _channel_id in tickets_db.connection.execute('SELECT user_id, channel_id FROM tickets'):
+    _user_to_channel[_user_id] = _channel_id
+    _channel_to_user[_channel_id] = _user_id
+
+
+@functools.cache
+def get_html_cleaners():
+    """Return the (sanitise, linkify) functions, importing bleach the first time a log is built."""
+
+    # Performance: bleach pulls in html5lib, so keep it off the startup path until a ticket is closed.
+    import bleach
+
+    html_sanitiser = bleach.sanitizer.Cleaner()
+    html_linkifier = bleach.sanitizer.Cleaner(filters=[functools.partial(bleach.linkifier.LinkifyFilter)])
+    # Performance: names, greetings and snippets repeat across messages and tickets, so remember cleaned strings.
+    return functools.lru_cache(maxsize=4096)(html_sanitiser.clean), functools.lru_cache(maxsize=4096)(html_linkifier.clean)
+
+
+# Performance: attachment markup used by the HTML log, parsed once rather than on every field.
+IMG_TPL = '<img src="{0}" alt="{0}">'
+VIDEO_TPL = '<video controls><source src="{0}" type="{1}"><a href="{0}">{0}</a></video>'
+LINK_TPL = '<a href="{0}">{0}</a>'
+
+
+# Page skeleton for HTML ticket logs; braces in the stylesheet are doubled for str.format.
+HTML_HEADER_TEMPLATE = '''
+<!doctype html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{bot_name}Log</title>
+<style type="text/css">
+    html {{ }}
+    body {{ font-size:16px; max-width:1000px; margin: 20px auto; padding:0; font-family:sans-serif; color:white; background:#2D2F33; }}
+    main {{ font-size:1em; line-height:1.3em; }}
+    p {{ white-space:pre-line; }}
+    div {{ }}
+    h1 {{ margin:25px 20px; font-weight:normal; font-size:3em; }}
+    h2 {{ margin:5px; font-size:1em; line-height:1.3em; }}
+    li.user h2 {{ color:lime; }}
+    li.staff h2 {{ color:orangered; }}
+    li.comment h2 {{ color:#6C757D; }}
+    span.datetime {{ color:#8898AA; font-weight:normal; }}
+    ul {{ list-style:none; padding:0; }}
+    li {{ margin:0 0 20px 0; }}
+</style>
+</head>
+<body>
+<main>
+<h1>{bot_name} Ticket Log</h1>
+<ul>
+'''
+HTML_FOOTER = '</ul></main></body></html>'
+
+
+@functools.lru_cache(maxsize=4)
+def render_html_header(bot_name: str) -> str:
+    """Return the HTML log header for the bot's name; formatted once, since the name rarely changes."""
+
+    return HTML_HEADER_TEMPLATE.format(bot_name=bot_name)
 
 
+def _guess_filetype(url: str) -> tuple[str | None, str | None]:
+    """Return the general file type and full mimetype guessed from a URL."""
 
-html_sanitiser = bleach.sanitizer.Cleaner()
-html_linkifier = bleach.sanitizer.Cleaner(filters=[functools.partial(bleach.linkifier.LinkifyFilter)])
+    # Performance: mimetypes only looks at the extension, so cache by that rather than by every unique URL.
+    # Discord attachment URLs are signed with a query string, so take the extension from the path alone.
+    return _guess_filetype_for_extension(os.path.splitext(urllib.parse.urlsplit(url).path)[1].lower())
 
 
+@functools.lru_cache(maxsize=1024)
+def _guess_filetype_for_extension(extension: str) -> tuple[str | None, str | None]:
+    mimetype = mimetypes.guess_type(f'file{extension}')[0]
+    return (mimetype.split('/', 1)[0] if mimetype else None), mimetype
 
-def embed_creator(title, message, colour=None, subject=None, author=None, anon=True, time=False):
+
+# Performance: build the embed colours once instead of matching on every embed.
+_COLOURS = {
+    'r': discord.Colour(0xed581f),
+    'g': discord.Colour(0x6ff943),
+    'b': discord.Colour(0x458ef9),
+    'e': discord.Colour(0xf03c1c),
+}
+_TIMED = frozenset({'r', 'g'})
+
+
+def embed_creator(title, message, colour=None, subject=None, author=None, anon=True, time=False, timestamp=None):
     embed = discord.Embed()
     embed.title = title
     embed.description = message
@@ -1385,23 +1716,15 @@ def embed_creator(title, message, colour=None, subject=None, author=None, anon=T
         else:
             embed.set_author(name=author.name, icon_url=author.display_avatar.url)
     if subject is not None:
-        if isinstance(subject, discord.User):
+        if isinstance(subject, (discord.User, discord.Member)):
             embed.set_footer(text=f'{subject.name}', icon_url=subject.display_avatar.url)
         elif isinstance(subject, discord.Guild):
             embed.set_footer(text=f'{subject.name}', icon_url=subject.icon)
-    match colour:
-        case 'r':
-            embed.colour = discord.Colour(0xed581f)
-            time = True
-        case 'g':
-            embed.colour = discord.Colour(0x6ff943)
-            time = True
-        case 'b':
-            embed.colour = discord.Colour(0x458ef9)
-        case 'e':
-            embed.colour = discord.Colour(0xf03c1c)
-    if time:
-        embed.timestamp = datetime.datetime.now()
+    if colour in _COLOURS:
+        embed.colour = _COLOURS[colour]
+    if time or colour in _TIMED:
+        # Handlers creating several embeds pass one timestamp so they all share it.
+        embed.timestamp = timestamp or datetime.datetime.now(datetime.timezone.utc)
     return embed
 
 
@@ -1456,20 +1779,8 @@ async def ticket_creator(
 
     try:
         if config.anonymous_tickets:
-            ticket_name = 'ticket 0001'
-            try:
-                with open('counter.txt', 'r+') as file:
-
-                    counter = int(file.read())
-                    counter += 1
-                    if counter >= 10000:
-                        counter = 1
-                    ticket_name = f'ticket {str(counter).rjust(4, "0")}'
-                    file.seek(0)
-                    file.write(str(counter))
-            except (ValueError, FileNotFoundError):
-                with open('counter.txt', 'w+') as file:
-                    file.write('1')
+            counter = await next_ticket_number()
+            ticket_name = f'ticket {str(counter).rjust(4, "0")}'
         else:
             ticket_name = f'{user.name}'
 
@@ -1504,10 +1815,7 @@ async def ticket_creator(
     # Bug fix: fetch the created thread to avoid sending to a stale placeholder that triggers Unknown Channel errors.
     thread = await ensure_thread_ready(thread)
 
-    with sqlite3.connect('tickets.db') as conn:
-        curs = conn.cursor()
-        curs.execute('INSERT INTO tickets VALUES (?, ?)', (user.id, thread.id))
-        conn.commit()
+    await add_ticket(user.id, thread.id)
 
     log_channel = require_text_channel(config.log_channel_id, 'log')
     await log_channel.send(embed=embed_creator('New Ticket', '', 'g', user))
@@ -1515,19 +1823,55 @@ async def ticket_creator(
 
 
 
+# Performance: role positions only change on role updates, so look each one up once per guild.
+_role_positions: dict[tuple[int, int], int] = {}
+
+
+def invalidate_role_positions() -> None:
+    _role_positions.clear()
+
+
+def get_role_position(guild: discord.Guild, role_id: int) -> int | None:
+    key = (guild.id, role_id)
+    position = _role_positions.get(key)
+    if position is None:
+        role = guild.get_role(role_id)
+        if role is None:
+            return None
+        position = _role_positions[key] = role.position
+    return position
+
+
+def member_has_role_level(member: discord.Member, role_id: int) -> bool:
+    position = get_role_position(member.guild, role_id)
+    return position is not None and member.top_role.position >= position
+
+
 def is_helper(ctx):
-    return ctx.guild is not None and ctx.author.top_role >= ctx.guild.get_role(config.helper_role_id)
+    return ctx.guild is not None and member_has_role_level(ctx.author, config.helper_role_id)
 
 
 def is_mod(ctx):
-    return ctx.guild is not None and ctx.author.top_role >= ctx.guild.get_role(config.mod_role_id)
+    return ctx.guild is not None and member_has_role_level(ctx.author, config.mod_role_id)
 
-def get_modmail_forum_ids() -> set[int]:
-    forum_ids = {config.forum_channel_id}
-    for option_config in help_options.values():
-        if option_config.forum_channel_id is not None:
-            forum_ids.add(option_config.forum_channel_id)
-    return forum_ids
+# Performance: the forum IDs only change when the config or help options are saved, so build them once.
+_modmail_forum_ids: frozenset[int] | None = None
+
+
+def invalidate_modmail_forum_ids() -> None:
+    global _modmail_forum_ids
+    _modmail_forum_ids = None
+
+
+def get_modmail_forum_ids() -> frozenset[int]:
+    global _modmail_forum_ids
+    if _modmail_forum_ids is None:
+        forum_ids = {config.forum_channel_id}
+        for option_config in help_options.values():
+            if option_config.forum_channel_id is not None:
+                forum_ids.add(option_config.forum_channel_id)
+        _modmail_forum_ids = frozenset(forum_ids)
+    return _modmail_forum_ids
 
 
 def is_modmail_channel(obj):
@@ -1539,8 +1883,7 @@ def is_modmail_channel(obj):
 async def interaction_is_mod(interaction: discord.Interaction) -> bool:
     if interaction.guild is None or interaction.guild.id != config.guild_id:
         return False
-    mod_role = interaction.guild.get_role(config.mod_role_id)
-    if mod_role is None:
+    if get_role_position(interaction.guild, config.mod_role_id) is None:
         return False
     if isinstance(interaction.user, discord.Member):
         member = interaction.user
@@ -1552,7 +1895,7 @@ async def interaction_is_mod(interaction: discord.Interaction) -> bool:
                 member = await interaction.guild.fetch_member(interaction.user.id)
             except (discord.NotFound, discord.HTTPException):
                 return False
-    return member.top_role >= mod_role
+    return member_has_role_level(member, config.mod_role_id)
 
 
 async def resolve_guild_member(guild: discord.Guild, user_id: int) -> discord.Member | None:
@@ -1567,6 +1910,29 @@ async def resolve_guild_member(guild: discord.Guild, user_id: int) -> discord.Me
         return None
 
 
+# Performance: remember users fetched from the API so later replies in the same ticket skip the round-trip.
+USER_CACHE_TTL_SECONDS = 600
+fetched_user_cache: dict[int, tuple[float, discord.User]] = {}
+
+
+async def resolve_user(user_id: int) -> discord.User:
+    """Return a user from the client cache, the short-lived fetch cache, or the API."""
+
+    user = bot.get_user(user_id)
+    if user is not None:
+        return user
+    now = time.monotonic()
+    cached = fetched_user_cache.get(user_id)
+    if cached is not None and now - cached[0] < USER_CACHE_TTL_SECONDS:
+        return cached[1]
+    user = await bot.fetch_user(user_id)
+    if len(fetched_user_cache) >= 1024:
+        for stale_id in [key for key, (fetched_at, _) in fetched_user_cache.items() if now - fetched_at >= USER_CACHE_TTL_SECONDS]:
+            del fetched_user_cache[stale_id]
+    fetched_user_cache[user_id] = (now, user)
+    return user
+
+
 # Feature: validate that configured channels expecting plain-text output are still text channels.
 def require_text_channel(channel_id: int, purpose: str) -> discord.TextChannel:
     """Return the named text channel or raise if it is missing or the wrong type."""
@@ -1640,44 +2006,148 @@ async def ensure_thread_open(thread: discord.Thread) -> discord.Thread:
     return thread
 
 
-def add_thread_to_group(group_name: str, thread_id: int) -> None:
-    """Record that a ticket thread belongs to a bulk-message group."""
+async def get_ticket_user(channel_id: int) -> int | None:
+    """Return the ID of the user who owns a ticket thread, or None when the thread is not a ticket."""
 
-    with sqlite3.connect('tickets.db') as conn:
-        curs = conn.cursor()
-        curs.execute(
-            'INSERT OR REPLACE INTO group_tags (group_name, thread_id) VALUES (?, ?)',
-            (group_name, thread_id)
-        )
-        conn.commit()
+    user_id = _channel_to_user.get(channel_id)
+    if user_id is None:
+        row = await tickets_db.fetchone('SELECT user_id FROM tickets WHERE channel_id=?', (channel_id,))
+        if row is None:
+            return None
+        user_id = row[0]
+        _channel_to_user[channel_id] = user_id
+        _user_to_channel[user_id] = channel_id
+    return user_id
+
+
+async def get_ticket_channel(user_id: int) -> int | None:
+    """Return the thread ID of a user's open ticket, or None when they have no ticket."""
+
+    channel_id = _user_to_channel.get(user_id)
+    if channel_id is None:
+        row = await tickets_db.fetchone('SELECT channel_id FROM tickets WHERE user_id=?', (user_id,))
+        if row is None:
+            return None
+        channel_id = row[0]
+        _user_to_channel[user_id] = channel_id
+        _channel_to_user[channel_id] = user_id
+    return channel_id
+
+
+# Performance: queue new ticket rows so a burst of tickets is committed in one transaction.
+TICKET_WRITE_WINDOW_SECONDS = 0.05
+_pending_ticket_writes: deque[tuple[int, int, asyncio.Future]] = deque()
+_ticket_writes_ready = asyncio.Event()
+_ticket_writer_task: asyncio.Task | None = None
+
+
+async def flush_ticket_writes() -> None:
+    """Insert every queued ticket row in a single transaction and resolve the waiting callers."""
+
+    batch = []
+    while _pending_ticket_writes:
+        batch.append(_pending_ticket_writes.popleft())
+    if not batch:
+        return
+
+    def insert_batch(conn: sqlite3.Connection) -> None:
+        conn.execute('BEGIN IMMEDIATE')
+        conn.executemany('INSERT INTO tickets VALUES (?, ?)', [(user_id, channel_id) for user_id, channel_id, _ in batch])
+
+    try:
+        await tickets_db.run(insert_batch)
+    except Exception as e:
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(e)
+        return
+
+    for user_id, channel_id, future in batch:
+        _user_to_channel[user_id] = channel_id
+        _channel_to_user[channel_id] = user_id
+        if not future.done():
+            future.set_result(None)
+
+
+async def _ticket_write_loop() -> None:
+    while True:
+        await _ticket_writes_ready.wait()
+        # Give other tickets opened in the same burst a moment to join the batch.
+        await asyncio.sleep(TICKET_WRITE_WINDOW_SECONDS)
+        _ticket_writes_ready.clear()
+        await flush_ticket_writes()
+
+
+def _flush_ticket_writes_sync() -> None:
+    # Anything still queued at shutdown is written directly so no ticket row is lost.
+    rows = [(user_id, channel_id) for user_id, channel_id, _ in _pending_ticket_writes]
+    _pending_ticket_writes.clear()
+    if rows:
+        with tickets_db.lock, tickets_db.connection:
+            tickets_db.connection.executemany('INSERT INTO tickets VALUES (?, ?)', rows)
+
+
+atexit.register(_flush_ticket_writes_sync)
+
+
+async def add_ticket(user_id: int, channel_id: int) -> None:
+    """Link a user to their new ticket thread, returning once the row is committed."""
+
+    global _ticket_writer_task
+
+    future = asyncio.get_running_loop().create_future()
+    _pending_ticket_writes.append((user_id, channel_id, future))
+    if _ticket_writer_task is None or _ticket_writer_task.done():
+        _ticket_writer_task = asyncio.create_task(_ticket_write_loop())
+    _ticket_writes_ready.set()
+    await future
+
+
+async def remove_ticket(channel_id: int) -> None:
+    """Forget the ticket linked to a thread."""
+
+    await tickets_db.execute('DELETE FROM tickets WHERE channel_id=?', (channel_id,))
+    user_id = _channel_to_user.pop(channel_id, None)
+    if user_id is not None and _user_to_channel.get(user_id) == channel_id:
+        del _user_to_channel[user_id]
+
+
+async def next_ticket_number() -> int:
+    """Advance the anonymous ticket counter, wrapping from 9999 back to 1."""
+
+    def increment(conn: sqlite3.Connection) -> int:
+        conn.execute('UPDATE ticket_counter SET value = CASE WHEN value >= 9999 THEN 1 ELSE value + 1 END WHERE id = 0')
+        return conn.execute('SELECT value FROM ticket_counter WHERE id = 0').fetchone()[0]
+
+    return await tickets_db.run(increment)
+
+
+async def add_thread_to_group(group_name: str, thread_id: int) -> None:
+    """Record that a ticket thread belongs to a bulk-message group."""
 
+    await tickets_db.execute(
+        'INSERT OR REPLACE INTO group_tags (group_name, thread_id) VALUES (?, ?)',
+        (group_name, thread_id)
+    )
 
 
-def get_group_threads(group_name: str) -> list[int]:
+async def get_group_threads(group_name: str) -> list[int]:
     """Return all ticket thread IDs currently tagged with the provided group name."""
 
-    with sqlite3.connect('tickets.db') as conn:
-        curs = conn.cursor()
-        curs.execute('SELECT thread_id FROM group_tags WHERE group_name=?', (group_name,))
-        return [row[0] for row in curs.fetchall()]
+    rows = await tickets_db.fetchall('SELECT thread_id FROM group_tags WHERE group_name=?', (group_name,))
+    return [row[0] for row in rows]
 
 
-def remove_thread_from_groups(thread_id: int) -> None:
+async def remove_thread_from_groups(thread_id: int) -> None:
     """Remove a ticket thread from any bulk-message groups it previously joined."""
 
-    with sqlite3.connect('tickets.db') as conn:
-        curs = conn.cursor()
-        curs.execute('DELETE FROM group_tags WHERE thread_id=?', (thread_id,))
-        conn.commit()
+    await tickets_db.execute('DELETE FROM group_tags WHERE thread_id=?', (thread_id,))
 
 
-def remove_group(group_name: str) -> None:
+async def remove_group(group_name: str) -> None:
     """Delete all tracking metadata for a bulk-message group."""
 
-    with sqlite3.connect('tickets.db') as conn:
-        curs = conn.cursor()
-        curs.execute('DELETE FROM group_tags WHERE group_name=?', (group_name,))
-        conn.commit()
+    await tickets_db.execute('DELETE FROM group_tags WHERE group_name=?', (group_name,))
 
 
 async def require_forum_channel() -> discord.ForumChannel:
@@ -2369,22 +2839,36 @@ async def relay_user_message(
     language: str | None = None,
     open_message_override: str | None = None
 ) -> None:
-    ticket_embed = embed_creator('Message Received', message.content, 'g', message.author)
-    user_embed = embed_creator('Message Sent', message.content, 'g', guild)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    ticket_embed = embed_creator('Message Received', message.content, 'g', message.author, timestamp=now)
+    user_embed = embed_creator('Message Sent', message.content, 'g', guild, timestamp=now)
     view = TranslateView(message.content) if message.content else None
     files = []
     total_filesize = 0
     attachment_embeds = []
-    attachment_count = 0
     if message.attachments:
-        for attachment in message.attachments:
-            attachment_count += 1
+        uploadable = []
+        uploadable_embeds = []
+        for attachment_count, attachment in enumerate(message.attachments, start=1):
             total_filesize += attachment.size
             if attachment.size < guild.filesize_limit:
-                files.append(await attachment.to_file())
-                attachment_embeds.append(embed_creator(f'Attachment {attachment_count}', '', 'g', message.author))
+                uploadable.append(attachment)
+                uploadable_embeds.append(embed_creator(f'Attachment {attachment_count}', '', 'g', message.author, timestamp=now))
             ticket_embed.add_field(name=f'Attachment {attachment_count}', value=attachment.url, inline=False)
-        user_embed.add_field(name='Attachment(s) Sent Successfully', value=len(message.attachments))
+        # Performance: download the attachments concurrently; one failed download only drops that file,
+        # and its URL is still listed on the ticket embed.
+        downloads = await asyncio.gather(*(attachment.to_file() for attachment in uploadable), return_exceptions=True)
+        failed = []
+        for attachment, attachment_embed, download in zip(uploadable, uploadable_embeds, downloads):
+            if isinstance(download, BaseException):
+                failed.append(attachment.filename)
+            else:
+                files.append(download)
+                attachment_embeds.append(attachment_embed)
+        user_embed.add_field(name='Attachment(s) Sent Successfully', value=len(message.attachments) - len(failed))
+        if failed:
+            # Tell the user which files never reached the ticket so they can send them again.
+            user_embed.add_field(name='Attachment(s) Failed to Send', value='\n'.join(failed)[:1024], inline=False)
     if total_filesize < guild.filesize_limit and len(files) <= 10:
         await thread.send(embed=ticket_embed, files=files, view=view)
     else:
@@ -2411,20 +2895,13 @@ async def relay_user_message(
 async def get_or_create_ticket_for_user(user: discord.User, guild: discord.Guild) -> discord.Thread:
     """Return an open ticket thread for the user, creating one when necessary."""
 
-    with sqlite3.connect('tickets.db') as conn:
-        curs = conn.cursor()
-        res = curs.execute('SELECT channel_id FROM tickets WHERE user_id=?', (user.id,))
-        row = res.fetchone()
+    thread_id = await get_ticket_channel(user.id)
 
     thread: discord.Thread | None = None
-    if row is not None:
-        thread_id = row[0]
+    if thread_id is not None:
         thread = await resolve_thread(thread_id)
         if thread is None:
-            with sqlite3.connect('tickets.db') as conn:
-                curs = conn.cursor()
-                curs.execute('DELETE FROM tickets WHERE channel_id=?', (thread_id,))
-                conn.commit()
+            await remove_ticket(thread_id)
         else:
             thread = await ensure_thread_open(thread)
 
@@ -2437,12 +2914,13 @@ async def get_or_create_ticket_for_user(user: discord.User, guild: discord.Guild
 async def gather_attachment_payloads(attachments: list[discord.Attachment], size_limit: int | None = None) -> list[tuple[str, bytes]]:
     """Read attachment contents so they can be re-used across multiple destinations."""
 
-    payloads: list[tuple[str, bytes]] = []
-    for attachment in attachments:
-        if size_limit is not None and attachment.size > size_limit:
-            raise ValueError(attachment.filename)
-        payloads.append((attachment.filename, await attachment.read()))
-    return payloads
+    if size_limit is not None:
+        for attachment in attachments:
+            if attachment.size > size_limit:
+                raise ValueError(attachment.filename)
+    # Performance: download every attachment concurrently instead of one after another.
+    contents = await asyncio.gather(*(attachment.read() for attachment in attachments))
+    return [(attachment.filename, data) for attachment, data in zip(attachments, contents)]
 
 
 def payloads_to_files(payloads: list[tuple[str, bytes]]) -> list[discord.File]:
@@ -2454,46 +2932,6 @@ def payloads_to_files(payloads: list[tuple[str, bytes]]) -> list[discord.File]:
     return files
 
 
-def buffers_to_payloads(buffers: list[tuple[io.BytesIO, str]]) -> list[tuple[str, bytes]]:
-    """Translate the legacy (BytesIO, filename) tuples into reusable payload data."""
-
-    payloads: list[tuple[str, bytes]] = []
-    for buffer, filename in buffers:
-        buffer.seek(0)
-        payloads.append((filename, buffer.getvalue()))
-    return payloads
-
-
-async def gather_attachment_payloads(attachments: list[discord.Attachment], size_limit: int | None = None) -> list[tuple[str, bytes]]:
-    """Read attachment contents so they can be re-used across multiple destinations."""
-
-    payloads: list[tuple[str, bytes]] = []
-    for attachment in attachments:
-        if size_limit is not None and attachment.size > size_limit:
-            raise ValueError(attachment.filename)
-        payloads.append((attachment.filename, await attachment.read()))
-    return payloads
-
-
-def payloads_to_files(payloads: list[tuple[str, bytes]]) -> list[discord.File]:
-    """Convert stored attachment bytes back into discord.File objects."""
-
-    files: list[discord.File] = []
-    for filename, data in payloads:
-        files.append(discord.File(io.BytesIO(data), filename))
-    return files
-
-
-def buffers_to_payloads(buffers: list[tuple[io.BytesIO, str]]) -> list[tuple[str, bytes]]:
-    """Translate the legacy (BytesIO, filename) tuples into reusable payload data."""
-
-    payloads: list[tuple[str, bytes]] = []
-    for buffer, filename in buffers:
-        buffer.seek(0)
-        payloads.append((filename, buffer.getvalue()))
-    return payloads
-
-
 # Feature: reduce gateway memory pressure by limiting member cache growth and startup guild chunking.
 intents = discord.Intents.default()
 intents.guilds = True
@@ -2600,7 +3038,8 @@ async def error_handler(error, message=None):
     else:
         embed = None
 
-    tb = "".join(traceback.format_exception(error))
+    # Performance: format the traceback on a worker thread so a burst of errors does not stall the event loop.
+    tb = await asyncio.to_thread(lambda: ''.join(traceback.format_exception(error)))
     owner = bot.get_user(config.bot_owner_id)
     if owner is None:
         try:
@@ -2609,12 +3048,14 @@ async def error_handler(error, message=None):
             owner = None
 
     if len(tb) > 2000:
+        # Encode once; each send still needs its own discord.File around the shared bytes.
+        tb_bytes = tb.encode('utf-8')
         if owner is not None:
             await owner.send(
-                file=discord.File(io.BytesIO(tb.encode('utf-8')), filename='error.txt'), embed=embed)
+                file=discord.File(io.BytesIO(tb_bytes), filename='error.txt'), embed=embed)
         if error_channel is not None:
             await error_channel.send(
-                file=discord.File(io.BytesIO(tb.encode('utf-8')), filename='error.txt'), embed=embed)
+                file=discord.File(io.BytesIO(tb_bytes), filename='error.txt'), embed=embed)
         else:
             print(tb)
     else:
@@ -2626,6 +3067,131 @@ async def error_handler(error, message=None):
             print(tb)
 
 
+async def summarise_transcript(transcript: str) -> str | None:
+    """Return a short AI summary of a ticket transcript, or None when it is unavailable."""
+
+    if not transcript.strip():
+        return None
+    # Performance: a ticket closed again without new messages reuses the summary instead of paying for another request.
+    key = _text_cache_key(transcript)
+    cached = _get_cached_result(ticket_summary_cache, key)
+    if cached is not None:
+        return cached
+    try:
+        # Summarise the transcript already held in memory instead of re-reading the log file.
+        response = await openai_client.chat.completions.create(
+            model='gpt-4o',
+            messages=[
+                {
+                    'role': 'system',
+                    'content': 'Summarise the following ticket conversation in under 100 words.'
+                },
+                {'role': 'user', 'content': transcript}
+            ]
+        )
+        summary = response.choices[0].message.content.strip()
+    except Exception:
+        return None
+    _cache_result(ticket_summary_cache, key, summary)
+    return summary
+
+
+# How long closing a ticket waits for the AI summary before posting the log without it.
+SUMMARY_WAIT_SECONDS = 10
+# Strong references to the background edits, so they are not garbage collected before finishing.
+late_summary_tasks: set[asyncio.Task] = set()
+
+
+async def add_late_summary(log: discord.Message, embed: discord.Embed, summary_task: asyncio.Task) -> None:
+    """Edit a summary that arrived after the log was posted into the log message, above the user field."""
+
+    summary = await summary_task
+    if not summary:
+        return
+    embed.insert_field_at(len(embed.fields) - 1, name='AI Summary', value=summary[:1024], inline=False)
+    try:
+        await log.edit(embed=embed)
+    except discord.HTTPException:
+        pass
+
+
+async def build_ticket_logs(thread: discord.Thread) -> tuple[str, str, str | None]:
+    """Stream a ticket's history into its text and HTML logs.
+
+    Returns the text transcript, the HTML log and the latest user message, which is used for language detection.
+    """
+
+    # Performance: build both logs while the history streams in instead of holding every message in a list.
+    txt_parts: list[str] = []
+    htm_parts: list[str] = [render_html_header(bot.user.name)]
+    user_sample: str | None = None
+    # Performance: bind the cleaners once; they are called several times for every message.
+    sanitize, linkify = get_html_cleaners()
+    try:
+        async for message in thread.history(limit=1024, oldest_first=True):
+            embeds = message.embeds
+            # Only digits, '-', ':' and a space, so the timestamp never needs sanitising.
+            ts = message.created_at.strftime('%y-%m-%d %H:%M')
+            if len(embeds) == 1:
+                embed = embeds[0]
+                title = embed.title
+                description = embed.description or ''
+                if title == 'Message Received':
+                    author_name = embed.footer.text if embed.footer else 'Unknown User'
+                    txt_parts.append(f'[{ts}] {author_name} (User): {description}')
+                    htm_class = 'user'
+                    name = sanitize(author_name)
+                    # The most recent message from the user is used to detect the closing language.
+                    if description.strip():
+                        user_sample = description
+                    else:
+                        user_sample = next(
+                            (field.value for field in embed.fields if field.value and field.value.strip()), user_sample
+                        )
+                elif title == 'Message Sent':
+                    # Bug fix: drop the literal anonymity suffix; strip() removed any of its characters from both ends.
+                    author_name = (embed.author.name if embed.author else 'Moderator').removesuffix(' (Anonymous)')
+                    txt_parts.append(f'[{ts}] {author_name} (Mod): {description}')
+                    htm_class = 'staff'
+                    name = sanitize(author_name)
+                else:
+                    continue
+                # Performance: collect fragments and join once instead of growing the string per field.
+                content_parts = [linkify(description)]
+                for field in embed.fields:
+                    value = field.value
+                    txt_parts.append(f'\n{value}')
+                    filetype, mimetype = _guess_filetype(value)
+                    if content_parts[0] or len(content_parts) > 1:
+                        content_parts.append('<br></br>')
+                    if filetype == 'image':
+                        if 'src=' not in value:
+                            content_parts.append(IMG_TPL.format(value))
+                        else:
+                            content_parts.append(value)
+                    elif filetype == 'video':
+                        content_parts.append(VIDEO_TPL.format(value, mimetype))
+                    else:
+                        content_parts.append(LINK_TPL.format(value))
+                content = ''.join(content_parts)
+            else:
+                txt_parts.append(f'[{ts}] {message.author.name} (Comment): {message.content}')
+                htm_class = 'comment'
+                name = sanitize(message.author.name)
+                content = sanitize(message.content)
+            txt_parts.append('\n')
+            # Performance: an f-string compiles to a single BUILD_STRING, several times faster than str.format here.
+            htm_parts.append(
+                f'<li class="{htm_class}"><h2><span class="name">{name}</span>'
+                f'<span class="datetime">{ts}</span></h2><p>{content}</p></li>'
+            )
+    except (discord.HTTPException, discord.Forbidden):
+        pass
+    htm_parts.append(HTML_FOOTER)
+
+    return ''.join(txt_parts), ''.join(htm_parts), user_sample
+
+
 async def close_ticket_thread(
     thread: discord.Thread,
     moderator: discord.abc.User,
@@ -2651,15 +3217,11 @@ async def close_ticket_thread(
 
     language = language.strip() if isinstance(language, str) else None
 
-    with sqlite3.connect('tickets.db') as conn:
-        curs = conn.cursor()
-        res = curs.execute('SELECT user_id FROM tickets WHERE channel_id=?', (thread.id,))
-        row = res.fetchone()
+    user_id = await get_ticket_user(thread.id)
 
-    if row is None:
+    if user_id is None:
         return False, 'This thread is not associated with a ticket.'
 
-    user_id = row[0]
     user: discord.User | None
     try:
         user = bot.get_user(user_id) or await bot.fetch_user(user_id)
@@ -2690,146 +3252,18 @@ async def close_ticket_thread(
                 return False, None
             await confirmation.delete()
 
-    with sqlite3.connect('tickets.db') as conn:
-        curs = conn.cursor()
-        curs.execute('DELETE FROM tickets WHERE channel_id=?', (thread.id,))
-        conn.commit()
-    remove_thread_from_groups(thread.id)
+    await remove_ticket(thread.id)
+    await remove_thread_from_groups(thread.id)
 
     await thread.send(embed=embed_creator('Closing Ticket...', '', 'b'))
 
-    try:
-        channel_messages = [message async for message in thread.history(limit=1024, oldest_first=True)]
-    except (discord.HTTPException, discord.Forbidden):
-        channel_messages = []
-    thread_messages: list[discord.Message] = []
+    transcript, htm_text, user_sample = await build_ticket_logs(thread)
+    # Performance: request the AI summary now so it runs while the user is notified.
+    summary_task = asyncio.create_task(summarise_transcript(transcript))
 
     closing_language = language
-    if closing_language is None and channel_messages:
-        user_sample: str | None = None
-        for history_message in reversed(channel_messages):
-            if len(history_message.embeds) == 1:
-                embed = history_message.embeds[0]
-                if embed.title == 'Message Received':
-                    if embed.description and embed.description.strip():
-                        user_sample = embed.description
-                        break
-                    for field in embed.fields:
-                        if field.value and field.value.strip():
-                            user_sample = field.value
-                            break
-                    if user_sample:
-                        break
-        if user_sample:
-            closing_language = await detect_language(user_sample[:5000])
-
-    txt_path = f'{user_id}.txt'
-    htm_path = f'{user_id}.htm'
-
-    with open(txt_path, 'w', encoding='utf-8') as txt_log:
-        for message in channel_messages:
-            if len(message.embeds) == 1:
-                embed = message.embeds[0]
-                content = embed.description or ''
-                if embed.title == 'Message Received':
-                    author_name = embed.footer.text if embed.footer else 'Unknown User'
-                    txt_log.write(
-                        f'[{message.created_at.strftime("%y-%m-%d %H:%M")}] {author_name} (User): {content}'
-                    )
-                elif embed.title == 'Message Sent':
-                    name = embed.author.name if embed.author else 'Moderator'
-                    txt_log.write(
-                        f'[{message.created_at.strftime("%y-%m-%d %H:%M")}] {name.strip(" (Anonymous)")} (Mod): {content}'
-                    )
-                else:
-                    continue
-                for field in embed.fields:
-                    txt_log.write(f'\n{field.value}')
-            else:
-                txt_log.write(
-                    f'[{message.created_at.strftime("%y-%m-%d %H:%M")}] {message.author.name} (Comment): {message.content}'
-                )
-            txt_log.write('\n')
-        for message in thread_messages:
-            txt_log.write(
-                f'\n[{message.created_at.strftime("%y-%m-%d %H:%M")}] {message.author.name}: {message.content}'
-            )
-
-    with open(htm_path, 'w', encoding='utf-8') as htm_log:
-        htm_log.write(
-            '''
-<!doctype html>
-<html lang="en">
-<head>
-<meta charset="utf-8">
-<meta name="viewport" content="width=device-width, initial-scale=1">
-<title>''' + bot.user.name + '''Log</title>
-<style type="text/css">
-    html { }
-    body { font-size:16px; max-width:1000px; margin: 20px auto; padding:0; font-family:sans-serif; color:white; background:#2D2F33; }
-    main { font-size:1em; line-height:1.3em; }
-    p { white-space:pre-line; }
-    div { }
-    h1 { margin:25px 20px; font-weight:normal; font-size:3em; }
-    h2 { margin:5px; font-size:1em; line-height:1.3em; }
-    li.user h2 { color:lime; }
-    li.staff h2 { color:orangered; }
-    li.comment h2 { color:#6C757D; }
-    span.datetime { color:#8898AA; font-weight:normal; }
-    ul { list-style:none; padding:0; }
-    li { margin:0 0 20px 0; }
-</style>
-</head>
-<body>
-<main>
-<h1>''' + bot.user.name + ''' Ticket Log</h1>
-<ul>
-'''
-        )
-        for message in channel_messages:
-            if len(message.embeds) == 1:
-                embed = message.embeds[0]
-                if embed.title == 'Message Received':
-                    htm_class = 'user'
-                    name = html_sanitiser.clean(embed.footer.text if embed.footer else 'Unknown User')
-                elif embed.title == 'Message Sent':
-                    htm_class = 'staff'
-                    name = html_sanitiser.clean((embed.author.name if embed.author else 'Moderator').removesuffix(' (Anonymous)'))
-                else:
-                    continue
-                content = embed.description or ''
-                content = html_linkifier.clean(content)
-                for field in embed.fields:
-                    value = field.value
-                    mimetype = mimetypes.guess_type(value)[0]
-                    if mimetype:
-                        filetype = mimetype.split('/', 1)[0]
-                    else:
-                        filetype = None
-                    if content:
-                        content += '<br></br>'
-                    if filetype == 'image':
-                        if 'src=' not in value:
-                            content += f'<img src="{value}" alt="{value}">'
-                        else:
-                            content += value
-                    elif filetype == 'video':
-                        content += f'<video controls><source src="{value}" type="{mimetype}"><a href="{value}">{value}</a></video>'
-                    else:
-                        content += f'<a href="{value}">{value}</a>'
-            else:
-                htm_class = 'comment'
-                name = html_sanitiser.clean(message.author.name)
-                content = html_sanitiser.clean(message.content)
-            htm_log.write(
-                f'''<li class="{htm_class}"><h2><span class="name">{name}</span><span class="datetime">{html_sanitiser.clean(message.created_at.strftime("%y-%m-%d %H:%M"))}</span></h2><p>{content}</p></li>'''
-            )
-        htm_log.write('</ul><ul>')
-        for message in thread_messages:
-            htm_log.write(
-                f'''<li class="comment"><h2><span class="name">{html_sanitiser.clean(message.author.name)}</span><span class="datetime">{html_sanitiser.clean(message.created_at.strftime("%y-%m-%d %H:%M"))}</span></h2><p>{html_linkifier.clean(message.content)}</p></li>'''
-            )
-        htm_log.write('</ul></main></body></html>')
+    if closing_language is None and user_sample:
+        closing_language = await detect_language(user_sample[:5000])
 
     guild = thread.guild or bot.get_guild(config.guild_id)
     close_message = close_message_override if close_message_override is not None else config.close_message
@@ -2854,76 +3288,94 @@ async def close_ticket_thread(
         icon_url = embed_user.footer.icon_url if embed_user.footer else None
         embed_user.set_footer(text=translation_notice, icon_url=icon_url)
 
-    if user is not None:
+    async def notify_user() -> None:
+        if user is not None:
+            try:
+                await user.send(embed=embed_user)
+            except discord.HTTPException:
+                # The closing DM is best-effort; it must never stop the log from being stored.
+                pass
+
+    summary_timed_out = False
+
+    async def upload_logs() -> discord.Message:
+        nonlocal summary_timed_out
+        # Performance: don't hold the close on a slow model; a late summary is edited into the log afterwards.
         try:
-            await user.send(embed=embed_user)
-        except discord.Forbidden:
-            pass
+            summary = await asyncio.wait_for(asyncio.shield(summary_task), SUMMARY_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            summary = None
+            summary_timed_out = True
+        if summary:
+            embed_guild.add_field(name='AI Summary', value=summary[:1024], inline=False)
+        embed_guild.add_field(name='User', value=f'<@{user_id}> ({user_id})', inline=False)
+
+        log_channel = require_text_channel(config.log_channel_id, 'log')
+        # Upload the logs from memory under one shared timestamp rather than re-reading them from disk.
+        stamp = datetime.datetime.now().strftime('%y%m%d_%H%M')
+        txt_bytes = transcript.encode('utf-8')
+        htm_bytes = htm_text.encode('utf-8')
+        htm_filename = f'{user_id}_{stamp}.htm'
+        # The repetitive markup compresses well, but browsers can only open the plain file from the log link,
+        # so only compress when both logs together would otherwise be too large for one message.
+        if len(txt_bytes) + len(htm_bytes) > log_channel.guild.filesize_limit:
+            htm_bytes = await asyncio.to_thread(gzip.compress, htm_bytes, 6)
+            htm_filename += '.gz'
+        return await log_channel.send(
+            embed=embed_guild,
+            files=[
+                discord.File(io.BytesIO(txt_bytes), filename=f'{user_id}_{stamp}.txt'),
+                discord.File(io.BytesIO(htm_bytes), filename=htm_filename)
+            ]
+        )
 
-    summary = None
-    try:
-        with open(txt_path, 'r', encoding='utf-8') as summary_file:
-            transcript = summary_file.read()
-        if transcript.strip():
-            response = await openai_client.chat.completions.create(
-                model='gpt-4o',
-                messages=[
-                    {
-                        'role': 'system',
-                        'content': 'Summarise the following ticket conversation in under 100 words.'
-                    },
-                    {'role': 'user', 'content': transcript}
-                ]
+    # Performance: the user's DM and the log upload are independent requests, so send them together.
+    _, log = await asyncio.gather(notify_user(), upload_logs())
+
+    log_row = (user_id, int(thread.created_at.timestamp()), log.attachments[0].url, log.attachments[1].url)
+
+    def store_log(conn: sqlite3.Connection) -> None:
+        log_rowid = conn.execute('INSERT INTO logs VALUES (?, ?, ?, ?)', log_row).lastrowid
+        if LOG_SEARCH_INDEX_AVAILABLE:
+            conn.execute(
+                'INSERT INTO log_fts (rowid, body, txt_log_url) VALUES (?, ?, ?)',
+                (log_rowid, transcript.lower(), log_row[2])
             )
-            summary = response.choices[0].message.content.strip()
-    except Exception:
-        summary = None
-    if summary:
-        embed_guild.add_field(name='AI Summary', value=summary[:1024], inline=False)
-    embed_guild.add_field(name='User', value=f'<@{user_id}> ({user_id})', inline=False)
 
-    log_channel = require_text_channel(config.log_channel_id, 'log')
-    log = await log_channel.send(
-        embed=embed_guild,
-        files=[
-            discord.File(txt_path, filename=f'{user_id}_{datetime.datetime.now().strftime("%y%m%d_%H%M")}.txt'),
-            discord.File(htm_path, filename=f'{user_id}_{datetime.datetime.now().strftime("%y%m%d_%H%M")}.htm')
-        ]
-    )
+    await logs_db.run(store_log)
 
-    with sqlite3.connect('logs.db') as conn:
-        curs = conn.cursor()
-        curs.execute(
-            'INSERT INTO logs VALUES (?, ?, ?, ?)',
-            (user_id, int(thread.created_at.timestamp()), log.attachments[0].url, log.attachments[1].url)
-        )
-        conn.commit()
+    if summary_timed_out:
+        late_summary_task = asyncio.create_task(add_late_summary(log, embed_guild, summary_task))
+        late_summary_tasks.add(late_summary_task)
+        late_summary_task.add_done_callback(late_summary_tasks.discard)
 
     await thread.delete()
 
-    try:
-        os.remove(txt_path)
-        os.remove(htm_path)
-    except OSError:
-        pass
-
     return True, None
 
 
-async def send_message(message, text, anon):
-    with sqlite3.connect('tickets.db') as conn:
-        curs = conn.cursor()
-        res = curs.execute('SELECT user_id FROM tickets WHERE channel_id=?', (message.channel.id, ))
-        user_id = res.fetchone()
+# Feature: share one delivery path between plain and translated moderator replies.
+async def _deliver(
+    message: discord.Message,
+    display_text: str,
+    original_text: str | None = None,
+    target_language: str | None = None,
+    notice: str | None = None,
+    anon: bool = False
+) -> None:
+    """DM a moderator reply to the ticket user and mirror it inside the ticket thread."""
+
+    user_id = await get_ticket_user(message.channel.id)
 
     try:
-        user_id = user_id[0]
-        user = bot.get_user(user_id)
+        if user_id is None:
+            # A thread without a ticket row is reported like an unresolvable user.
+            raise ValueError(message.channel.id)
+        # Performance: the guild member doubles as the recipient, so the user lookup only runs when the
+        # member is missing, to tell a deleted account apart from someone who left the server.
+        user = await resolve_guild_member(message.guild, user_id)
         if user is None:
-            # Bug fix: assign fetch results so downstream checks and sends always use a resolved user object.
-            user = await bot.fetch_user(user_id)
-        # Bug fix: validate membership with guild member lookups because mutual_guilds can be empty when member caching is disabled.
-        elif await resolve_guild_member(message.guild, user_id) is None:
+            await resolve_user(user_id)
             await message.channel.send(embed=embed_creator('Failed to Send', 'User not in server.', 'e'))
             return
     except (ValueError, TypeError, discord.NotFound):
@@ -2932,24 +3384,26 @@ async def send_message(message, text, anon):
                                 'e'))
         return
 
-    channel_embed = embed_creator('Message Sent', text, 'r', user, message.author, anon)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    channel_embed = embed_creator('Message Sent', display_text, 'r', user, message.author, anon, timestamp=now)
     if anon:
-        user_embed = embed_creator('Message Received', text, 'r', message.guild)
+        user_embed = embed_creator('Message Received', display_text, 'r', message.guild, timestamp=now)
     else:
-        user_embed = embed_creator('Message Received', text, 'r', message.guild, message.author, False)
-    files = []
-    files_to_send = []
-    for attachment in message.attachments:
-        if attachment.size > 8000000:
-            await message.channel.send(
-                embed=embed_creator('Failed to Send', 'One or more attachments are larger than 8 MB.', 'e'))
-            return
-        file = io.BytesIO(await attachment.read())
-        file.seek(0)
-        files.append((file, attachment.filename))
-        files_to_send.append(discord.File(file, attachment.filename))
+        user_embed = embed_creator('Message Received', display_text, 'r', message.guild, message.author, False, timestamp=now)
+    if target_language:
+        channel_embed.add_field(name='Original', value=(original_text or '')[:1024], inline=False)
+        user_embed.add_field(name='Original', value=(original_text or '')[:1024], inline=False)
+        if notice:
+            user_embed.set_footer(text=notice, icon_url=user_embed.footer.icon_url)
+
     try:
-        user_message = await user.send(embed=user_embed, files=files_to_send)
+        attachments = await gather_attachment_payloads(message.attachments, 8000000)
+    except ValueError:
+        await message.channel.send(
+            embed=embed_creator('Failed to Send', 'One or more attachments are larger than 8 MB.', 'e'))
+        return
+    try:
+        user_message = await user.send(embed=user_embed, files=payloads_to_files(attachments))
     except discord.Forbidden:
         await message.channel.send(
             embed=embed_creator('Failed to Send', f'User has server DMs disabled or has blocked {bot.user.name}.', 'e'))
@@ -2959,16 +3413,75 @@ async def send_message(message, text, anon):
         channel_embed.add_field(name=f'Attachment {index + 1}', value=attachment.url, inline=False)
     await message.delete()
     # Must be rebuilt because a discord.File object can only be used once.
-    files_to_send = []
-    for file in files:
-        file[0].seek(0)
-        files_to_send.append(discord.File(file[0], file[1]))
-    await message.channel.send(embed=channel_embed, files=files_to_send)
+    await message.channel.send(embed=channel_embed, files=payloads_to_files(attachments))
+
+
+async def send_message(message, text, anon):
+    await _deliver(message, text, anon=anon)
+
+# Performance: remember recent AI results keyed by a hash of the text so repeated phrases skip the OpenAI round-trip.
+AI_RESULT_CACHE_SIZE = 4096
+detected_language_cache: OrderedDict[bytes, str] = OrderedDict()
+english_translation_cache: OrderedDict[bytes, str] = OrderedDict()
+ticket_summary_cache: OrderedDict[bytes, str] = OrderedDict()
+
+
+def _text_cache_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def _get_cached_result(cache: OrderedDict[bytes, str], key: bytes) -> str | None:
+    result = cache.get(key)
+    if result is not None:
+        cache.move_to_end(key)
+    return result
+
+
+def _cache_result(cache: OrderedDict[bytes, str], key: bytes, result: str) -> None:
+    cache[key] = result
+    cache.move_to_end(key)
+    if len(cache) > AI_RESULT_CACHE_SIZE:
+        cache.popitem(last=False)
+
 
 # New feature: translate user messages to English for moderators
 # First detect the language using AI, translating only when necessary
+# Performance: words that are frequent in English and rare elsewhere, used to skip the model for plain English.
+ENGLISH_MARKER_WORDS = frozenset({
+    'the', 'and', 'you', 'your', 'that', 'this', 'with', 'have', 'was', 'are', 'for', 'not', 'but', 'what',
+    'can', 'will', 'would', 'should', 'could', 'just', 'there', 'their', 'they', 'about', 'from', 'been',
+    'i', 'my', 'it', 'is', 'to', 'of', 'we', 'he', 'she', 'him', 'her', 'why', 'how', 'when', 'where', 'who',
+    'do', 'does', "don't", "i'm", "it's", 'please', 'thanks', 'help', 'know', 'get', 'got', 'like', 'if', 'or',
+})
+ENGLISH_MARKER_MIN_WORDS = 3
+ENGLISH_MARKER_MIN_SHARE = 0.35
+
+
+def looks_like_english(text: str) -> bool:
+    """Cheaply recognise ASCII text that is clearly English from its share of common English words."""
+
+    if not text.isascii():
+        return False
+    words = [word.strip('.,!?;:"()[]*_~`') for word in text.lower().split()]
+    words = [word for word in words if word.isalpha() or "'" in word]
+    if len(words) < ENGLISH_MARKER_MIN_WORDS:
+        return False
+    hits = sum(word in ENGLISH_MARKER_WORDS for word in words)
+    return hits >= ENGLISH_MARKER_MIN_SHARE * len(words)
+
+
 async def detect_language(text: str) -> str:
     """Identify the language of the given text."""
+
+    # Numbers, punctuation and emoji carry no language, and the model answers English for them anyway.
+    if not any(character.isalpha() for character in text):
+        return 'english'
+    if looks_like_english(text):
+        return 'english'
+    key = _text_cache_key(text)
+    cached = _get_cached_result(detected_language_cache, key)
+    if cached is not None:
+        return cached
     try:
         response = await openai_client.chat.completions.create(
             model='gpt-4o',
@@ -2985,39 +3498,51 @@ async def detect_language(text: str) -> str:
                 {'role': 'user', 'content': build_guarded_payload(text)}
             ]
         )
-        return response.choices[0].message.content.strip().lower()
+        language = response.choices[0].message.content.strip().lower()
     except Exception:
         return 'unknown'
+    _cache_result(detected_language_cache, key, language)
+    return language
 
 async def translate_text(text: str) -> str:
     """Translate provided text to English using GPT-4o."""
 
-    if not text.strip():
+    if not text.strip() or looks_like_english(text):
         return text
 
-    language = await detect_language(text)
-    if language in ('en', 'english'):
-        return text
+    key = _text_cache_key(text)
+    cached = _get_cached_result(english_translation_cache, key)
+    if cached is not None:
+        return cached
 
     try:
-        # Updated prompt for clearer translations without disclaimers
+        # Performance: detect and translate in one JSON-mode request instead of two sequential calls.
         response = await openai_client.chat.completions.create(
             model='gpt-4o',
+            response_format={'type': 'json_object'},
             messages=[
                 {
                     'role': 'system',
-                    'content': f"{TRANSLATION_NOTICE} Translate the following text to English. Respond only with the translation and no additional text."
+                    'content': (
+                        f'{TRANSLATION_NOTICE} If the text is already English, respond with {{"en": true}}. '
+                        'Otherwise translate it to English and respond with {"en": false, "text": "<translation>"}. '
+                        'Respond only with that JSON object and no additional text.'
+                    )
                 },
                 {'role': 'user', 'content': build_guarded_payload(text)}
             ]
         )
-        translated = response.choices[0].message.content.strip()
-        translated = clean_guard_markers(translated)
-        # The notice text lives only in the system prompt so it never
-        # appears in the translated result returned to the bot
-        return translated
+        result = json.loads(response.choices[0].message.content)
+        if result.get('en') is True:
+            translated = text
+        else:
+            # The notice text lives only in the system prompt so it never
+            # appears in the translated result returned to the bot
+            translated = clean_guard_markers(str(result['text']).strip())
     except Exception:
         return text
+    _cache_result(english_translation_cache, key, translated)
+    return translated
 
 # Feature: translate moderator replies into arbitrary languages for users using GPT-4o
 async def translate_to_language(text: str, language: str, *, use_cache: bool = False) -> str:
@@ -3161,7 +3686,7 @@ async def sweep_help_option_prompt_timeouts() -> None:
         for prompt_id in expired_prompt_ids:
             help_option_prompt_records.pop(prompt_id, None)
         with open(HELP_OPTION_PROMPTS_FILE, 'w', encoding='utf-8') as prompt_file:
-            json.dump(help_option_prompt_records, prompt_file, ensure_ascii=False, indent=2)
+            prompt_file.write(json.dumps(help_option_prompt_records, ensure_ascii=False, indent=2))
 
 
 async def get_translation_notice(language: str) -> str:
@@ -3173,62 +3698,14 @@ async def send_translated_message(message, language: str, text: str, anon: bool)
     """Send a message translated for the recipient along with the original."""
     translated = await translate_to_language(text, language)
     notice = await get_translation_notice(language)
-    with sqlite3.connect('tickets.db') as conn:
-        curs = conn.cursor()
-        res = curs.execute('SELECT user_id FROM tickets WHERE channel_id=?', (message.channel.id, ))
-        user_id = res.fetchone()
-
-    try:
-        user_id = user_id[0]
-        user = bot.get_user(user_id)
-        if user is None:
-            # Bug fix: assign fetch results so downstream checks and sends always use a resolved user object.
-            user = await bot.fetch_user(user_id)
-        # Bug fix: validate membership with guild member lookups because mutual_guilds can be empty when member caching is disabled.
-        elif await resolve_guild_member(message.guild, user_id) is None:
-            await message.channel.send(embed=embed_creator('Failed to Send', 'User not in server.', 'e'))
-            return
-    except (ValueError, TypeError, discord.NotFound):
-        await message.channel.send(
-            embed=embed_creator('Failed to Send', f'User may have deleted their account. Please close or manually delete this ticket.',
-                                'e'))
-        return
-
-    channel_embed = embed_creator('Message Sent', translated, 'r', user, message.author, anon)
-    channel_embed.add_field(name='Original', value=text[:1024], inline=False)
-    if anon:
-        user_embed = embed_creator('Message Received', translated, 'r', message.guild)
-    else:
-        user_embed = embed_creator('Message Received', translated, 'r', message.guild, message.author, False)
-    user_embed.add_field(name='Original', value=text[:1024], inline=False)
-    user_embed.set_footer(text=notice, icon_url=user_embed.footer.icon_url)
-
-    files = []
-    files_to_send = []
-    for attachment in message.attachments:
-        if attachment.size > 8000000:
-            await message.channel.send(
-                embed=embed_creator('Failed to Send', 'One or more attachments are larger than 8 MB.', 'e'))
-            return
-        file = io.BytesIO(await attachment.read())
-        file.seek(0)
-        files.append((file, attachment.filename))
-        files_to_send.append(discord.File(file, attachment.filename))
-    try:
-        user_message = await user.send(embed=user_embed, files=files_to_send)
-    except discord.Forbidden:
-        await message.channel.send(
-            embed=embed_creator('Failed to Send', f'User has server DMs disabled or has blocked {bot.user.name}.', 'e'))
-        return
-
-    for index, attachment in enumerate(user_message.attachments):
-        channel_embed.add_field(name=f'Attachment {index + 1}', value=attachment.url, inline=False)
-    await message.delete()
-    files_to_send = []
-    for file in files:
-        file[0].seek(0)
-        files_to_send.append(discord.File(file[0], file[1]))
-    await message.channel.send(embed=channel_embed, files=files_to_send)
+    await _deliver(
+        message,
+        translated,
+        original_text=text,
+        target_language=language,
+        notice=notice,
+        anon=anon
+    )
 
 
 @bot.event
@@ -3244,6 +3721,21 @@ async def on_command_error(ctx, error):
     await error_handler(error, ctx.message)
 
 
+@bot.event
+async def on_guild_role_create(role):
+    invalidate_role_positions()
+
+
+@bot.event
+async def on_guild_role_update(before, after):
+    invalidate_role_positions()
+
+
+@bot.event
+async def on_guild_role_delete(role):
+    invalidate_role_positions()
+
+
 @bot.event
 async def on_message(message):
 
@@ -3258,18 +3750,13 @@ async def on_message(message):
     # Message from user to mod.
     if message.guild is None:
 
-        if message.author.id in blacklist_list:
+        if message.author.id in blacklist_store.get():
             return
 
         guild = bot.get_guild(config.guild_id)
 
 
-        with sqlite3.connect('tickets.db') as conn:
-            curs = conn.cursor()
-            res = curs.execute('SELECT channel_id FROM tickets WHERE user_id=?', (message.author.id, ))
-            channel_row = res.fetchone()
-
-        channel_id = channel_row[0] if channel_row else None
+        channel_id = await get_ticket_channel(message.author.id)
         channel = None
         if channel_id:
             channel = bot.get_channel(channel_id) or guild.get_thread(channel_id)
@@ -3277,17 +3764,11 @@ async def on_message(message):
                 try:
                     channel = await guild.fetch_channel(channel_id)
                 except (discord.NotFound, discord.HTTPException):
-                    with sqlite3.connect('tickets.db') as conn:
-                        curs = conn.cursor()
-                        curs.execute('DELETE FROM tickets WHERE channel_id=?', (channel_id,))
-                        conn.commit()
+                    await remove_ticket(channel_id)
                     channel = None
 
         if isinstance(channel, discord.Thread) and channel.archived:
-            with sqlite3.connect('tickets.db') as conn:
-                curs = conn.cursor()
-                curs.execute('DELETE FROM tickets WHERE channel_id=?', (channel.id,))
-                conn.commit()
+            await remove_ticket(channel.id)
             try:
                 await channel.delete()
             except discord.HTTPException:
@@ -3432,22 +3913,14 @@ async def send(ctx, user: discord.User, *, message: str = ''):
         await ctx.send(embed=embed_creator('', 'I cannot DM myself!', 'e'))
         return
 
-    with sqlite3.connect('tickets.db') as conn:
-        curs = conn.cursor()
-        res = curs.execute('SELECT channel_id FROM tickets WHERE user_id=?', (user.id, ))
-        channel_row = res.fetchone()
-
-    channel_id = channel_row[0] if channel_row else None
+    channel_id = await get_ticket_channel(user.id)
     if channel_id:
         existing_channel = bot.get_channel(channel_id) or ctx.guild.get_thread(channel_id)
         if existing_channel is None:
             try:
                 existing_channel = await ctx.guild.fetch_channel(channel_id)
             except (discord.NotFound, discord.HTTPException):
-                with sqlite3.connect('tickets.db') as conn:
-                    curs = conn.cursor()
-                    curs.execute('DELETE FROM tickets WHERE channel_id=?', (channel_id,))
-                    conn.commit()
+                await remove_ticket(channel_id)
                 existing_channel = None
         if existing_channel is not None:
             await ctx.send(embed=embed_creator('', f'A ticket for this user already exists: <#{channel_id}>', 'e'))
@@ -3460,17 +3933,12 @@ async def send(ctx, user: discord.User, *, message: str = ''):
         return
 
     user_embed = embed_creator('Message Received', message, 'r', ctx.guild)
-    files = []
-    files_to_send = []
-    for attachment in ctx.message.attachments:
-        if attachment.size >= ctx.filesize_limit:
-            await ctx.send(embed=embed_creator('Failed to Send', f'One or more attachments are larger than {ctx.filesize_limit/1024/1024} MB.',
-                                               'e'))
-            return
-        file = io.BytesIO(await attachment.read())
-        file.seek(0)
-        files.append((file, attachment.filename))
-        files_to_send.append(discord.File(file, attachment.filename))
+    if any(attachment.size >= ctx.filesize_limit for attachment in ctx.message.attachments):
+        await ctx.send(embed=embed_creator('Failed to Send', f'One or more attachments are larger than {ctx.filesize_limit/1024/1024} MB.',
+                                           'e'))
+        return
+    # Performance: attachments are only uploaded once here (the ticket links their URLs), so convert them directly.
+    files_to_send = list(await asyncio.gather(*(attachment.to_file() for attachment in ctx.message.attachments)))
     try:
         user_message = await user.send(embed=user_embed, files=files_to_send)
     except discord.Forbidden:
@@ -3487,11 +3955,6 @@ async def send(ctx, user: discord.User, *, message: str = ''):
     log_channel = require_text_channel(config.log_channel_id, 'log')
     await log_channel.send(embed=embed_creator('Ticket Created', '', 'r', user, ctx.author, anon=False))
 
-    files_to_send = []
-    for file in files:
-        file[0].seek(0)
-        files_to_send.append(discord.File(file[0], file[1]))
-
     await ctx.channel.send(embed=embed_creator('New Message Sent', f'Ticket: {ticket_channel.mention}', 'r', time=False))
 
 
@@ -3513,7 +3976,7 @@ async def execute_group_reply(
         await ctx.send(embed=embed_creator('', 'Provide the group name you want to reply to.', 'e'))
         return
 
-    thread_ids = get_group_threads(cleaned_group)
+    thread_ids = await get_group_threads(cleaned_group)
     if not thread_ids:
         await ctx.send(embed=embed_creator('', f'No tickets are tracked for `{cleaned_group}`.', 'e'))
         return
@@ -3545,23 +4008,19 @@ async def execute_group_reply(
     for thread_id in thread_ids:
         thread = await resolve_thread(thread_id)
         if thread is None:
-            remove_thread_from_groups(thread_id)
+            await remove_thread_from_groups(thread_id)
             failures.append(f'Ticket thread `{thread_id}` no longer exists.')
             continue
 
-        with sqlite3.connect('tickets.db') as conn:
-            curs = conn.cursor()
-            res = curs.execute('SELECT user_id FROM tickets WHERE channel_id=?', (thread_id,))
-            row = res.fetchone()
+        user_id = await get_ticket_user(thread_id)
 
-        if row is None:
-            remove_thread_from_groups(thread_id)
+        if user_id is None:
+            await remove_thread_from_groups(thread_id)
             failures.append(f'{thread.mention}: not linked to a user.')
             continue
 
-        user_id = row[0]
         try:
-            user = bot.get_user(user_id) or await bot.fetch_user(user_id)
+            user = (thread.guild or ctx.guild).get_member(user_id) or await resolve_user(user_id)
         except discord.HTTPException:
             failures.append(f'{thread.mention}: unable to fetch user `{user_id}`.')
             continue
@@ -3704,7 +4163,7 @@ async def sendmany(ctx, ids: str, group_name: str, *, message: str = ''):
             failures.append(f'{user.mention}: failed to apply group tag.')
             continue
 
-        add_thread_to_group(cleaned_group, thread.id)
+        await add_thread_to_group(cleaned_group, thread.id)
         delivered.append(thread.mention)
 
     summary = embed_creator('Send Many', f'Delivered to {len(delivered)} ticket(s).', 'g' if not failures else 'b', ctx.guild, ctx.author, anon=False)
@@ -3791,7 +4250,7 @@ async def execute_group_close(
         await ctx.send(embed=embed_creator('', 'Provide the group name you want to close.', 'e'))
         return
 
-    thread_ids = get_group_threads(cleaned_group)
+    thread_ids = await get_group_threads(cleaned_group)
     if not thread_ids:
         await ctx.send(embed=embed_creator('', f'No tickets are tracked for `{cleaned_group}`.', 'e'))
         return
@@ -3822,7 +4281,7 @@ async def execute_group_close(
     for thread_id in thread_ids:
         thread = await resolve_thread(thread_id)
         if thread is None:
-            remove_thread_from_groups(thread_id)
+            await remove_thread_from_groups(thread_id)
             failures.append(f'Ticket thread `{thread_id}` no longer exists.')
             continue
 
@@ -3845,7 +4304,7 @@ async def execute_group_close(
         elif error:
             failures.append(f'{thread.mention}: {error}')
 
-    remove_group(cleaned_group)
+    await remove_group(cleaned_group)
 
     if forums_to_cleanup:
         await asyncio.sleep(1)
@@ -3972,7 +4431,7 @@ async def snippet(ctx, name: str):
         return
 
     name = name.lower()
-    content = snippets.get(name)
+    content = snippets_store.get().get(name)
     if content is not None:
         await send_message(ctx.message, content, True)
     else:
@@ -3986,6 +4445,7 @@ async def view(ctx, name: str = ''):
 
     if name:
         name = name.lower()
+        snippets = snippets_store.get()
         if name in snippets:
             embed = embed_creator('Snippet', '', 'b')
             embed.add_field(name='Name', value=name)
@@ -3995,11 +4455,8 @@ async def view(ctx, name: str = ''):
             await ctx.send(embed=embed_creator('', f'Snippet `{name}` not found.', 'e'))
     else:
         embed = embed_creator('Snippets', '', 'b')
-        for key, value in snippets.items():
-            if len(value) > 103:
-                embed.add_field(name=key, value=f'{value[:100]}...', inline=False)
-            else:
-                embed.add_field(name=key, value=value, inline=False)
+        for key, preview in get_snippet_previews().items():
+            embed.add_field(name=key, value=preview, inline=False)
         await ctx.send(embed=embed)
 
 
@@ -4008,6 +4465,7 @@ async def view(ctx, name: str = ''):
 async def add(ctx, name: str, *, content: str):
 
     name = name.lower()
+    snippets = snippets_store.get()
     if len(snippets) >= 25:
         await ctx.send(embed=embed_creator('', 'Maximum number of snippets already reached: 25.', 'e'))
         return
@@ -4024,9 +4482,8 @@ async def add(ctx, name: str, *, content: str):
         await ctx.send(embed=embed_creator('', f'Name too long: `{len(name)}` characters. The maximum length of snippet names is 32.', 'e'))
         return
 
-    snippets.update({name: content})
-    with open('snippets.json', 'w', encoding='utf-8') as file:
-        json.dump(snippets, file, ensure_ascii=False)
+    snippets[name] = content
+    snippets_store.changed()
     embed = embed_creator('Snippet Added', '', 'b')
     embed.add_field(name='Name', value=name)
     embed.add_field(name='Content', value=content, inline=False)
@@ -4038,10 +4495,12 @@ async def add(ctx, name: str, *, content: str):
 async def edit(ctx, name: str, *, content: str):
 
     name = name.lower()
+    snippets = snippets_store.get()
     if name in snippets:
-        snippets.update({name: content})
-        with open('snippets.json', 'w', encoding='utf-8') as file:
-            json.dump(snippets, file, ensure_ascii=False)
+        # Performance: re-saving the same content leaves the file untouched.
+        if snippets[name] != content:
+            snippets[name] = content
+            snippets_store.changed()
         embed = embed_creator('Snippet Edited', '', 'b')
         embed.add_field(name='Name', value=name)
         embed.add_field(name='Content', value=content, inline=False)
@@ -4055,10 +4514,10 @@ async def edit(ctx, name: str, *, content: str):
 async def remove(ctx, name: str):
 
     name = name.lower()
+    snippets = snippets_store.get()
     if name in snippets:
         content = snippets.pop(name)
-        with open('snippets.json', 'w', encoding='utf-8') as file:
-            json.dump(snippets, file, ensure_ascii=False)
+        snippets_store.changed()
         embed = embed_creator('Snippet Removed', '', 'b')
         embed.add_field(name='Name', value=name)
         embed.add_field(name='Content', value=content, inline=False)
@@ -4079,9 +4538,8 @@ async def blacklist(ctx):
 async def view(ctx):
     """Shows all blacklisted users"""
 
-    content = ''
-    for user_id in blacklist_list:
-        content += f'<@{user_id}>\n'
+    # Performance: join the mentions once instead of growing the string on every user.
+    content = ''.join(f'<@{user_id}>\n' for user_id in sorted(blacklist_store.get()))
     await ctx.send(embed=embed_creator('Blacklist', content, 'b'))
 
 
@@ -4090,7 +4548,7 @@ async def view(ctx):
 async def check(ctx, user: discord.User):
     """Checks if a user is blacklisted"""
 
-    if user.id in blacklist_list:
+    if user.id in blacklist_store.get():
         await ctx.send(embed=embed_creator('', f'\u2714 **{user}** is blacklisted.', 'b'))
     else:
         await ctx.send(embed=embed_creator('', f'\u274e **{user}** is NOT blacklisted.', 'b'))
@@ -4101,7 +4559,7 @@ async def check(ctx, user: discord.User):
 async def add(ctx, user: discord.User, *, reason: str = ''):
     """Blacklists a user"""
 
-    if user.id in blacklist_list:
+    if user.id in blacklist_store.get():
         await ctx.send(embed=embed_creator('', 'User is already blacklisted.', 'e'))
         return
     if len(reason) > 1024:
@@ -4122,9 +4580,8 @@ async def add(ctx, user: discord.User, *, reason: str = ''):
     if buttons.value is False:
         await confirmation.edit(embed=embed_creator('', 'Blacklisting cancelled by moderator.', 'b'), view=None)
         return
-    blacklist_list.append(user.id)
-    with open('blacklist.json', 'w', encoding='utf-8') as file:
-        json.dump(blacklist_list, file, ensure_ascii=False)
+    blacklist_store.get().add(user.id)
+    blacklist_store.changed()
 
     embed_user = embed_creator('Access Revoked', f'Your access to {bot.user.name} has been revoked by the moderators. You will no longer be able to send messages here.', 'r', ctx.guild)
     confirmation_msg = f'**{user}** has been blacklisted. They will no longer be able to message {bot.user.name}. User notified by direct message.'
@@ -4148,10 +4605,10 @@ async def add(ctx, user: discord.User, *, reason: str = ''):
 async def remove(ctx, user_id: int):
     """Un-blacklists a user"""
 
-    if user_id in blacklist_list:
-        blacklist_list.remove(user_id)
-        with open('blacklist.json', 'w', encoding='utf-8') as file:
-            json.dump(blacklist_list, file, ensure_ascii=False)
+    blacklist = blacklist_store.get()
+    if user_id in blacklist:
+        blacklist.discard(user_id)
+        blacklist_store.changed()
         await ctx.send(embed=embed_creator('Blacklist Updated', f'User with ID `{user_id}` has been un-blacklisted. They can now message {bot.user.name}.', 'b'))
     else:
         await ctx.send(embed=embed_creator('', f'User with ID `{user_id}` is not blacklisted.', 'e'))
@@ -4169,26 +4626,74 @@ async def search(ctx, user: discord.User, *, search_term: str = ''):
         searching = None
 
     embeds = [embed_creator(f'Tickets for {user}', '', 'b')]
-    with sqlite3.connect('logs.db') as conn:
-        curs = conn.cursor()
-        curs.execute('SELECT timestamp, txt_log_url, htm_log_url FROM logs WHERE user_id = ?', (user.id,))
+    # Performance: buffer each embed's lines and join them once before sending.
+    description_parts: list[list[str]] = [[]]
+    description_length = 0
+    log_rows = await logs_db.fetchall('SELECT timestamp, txt_log_url, htm_log_url FROM logs WHERE user_id = ? ORDER BY timestamp DESC', (user.id,))
+
+    indexed_urls: set[str] = set()
+    matched_urls: set[str] = set()
+    if search_term and LOG_SEARCH_INDEX_AVAILABLE:
+        # Join through logs so both lookups start from the user's rows instead of scanning every transcript.
+        # Matching the URL as well as the rowid keeps a renumbered logs row from pairing with another transcript.
+        indexed_join = 'FROM logs l JOIN log_fts f ON f.rowid = l.rowid AND f.txt_log_url = l.txt_log_url '
+        indexed_rows = await logs_db.fetchall(f'SELECT l.txt_log_url {indexed_join}WHERE l.user_id = ?', (user.id,))
+        indexed_urls = {row[0] for row in indexed_rows}
+        if len(search_term) >= 3:
+            matched_rows = await logs_db.fetchall(
+                f'SELECT l.txt_log_url {indexed_join}WHERE l.user_id = ? AND log_fts MATCH ?',
+                (user.id, build_fts_phrase(search_term))
+            )
+        else:
+            # Trigram indexes need at least three characters, so shorter terms scan the user's stored text.
+            matched_rows = await logs_db.fetchall(
+                f'SELECT l.txt_log_url {indexed_join}WHERE l.user_id = ? AND instr(f.body, ?) > 0',
+                (user.id, search_term)
+            )
+        matched_urls = {row[0] for row in matched_rows}
 
-        async with aiohttp.ClientSession() as session:
-            for timestamp, txt_log_url, htm_log_url in curs.fetchall():
-                if search_term:
-                    async with session.get(txt_log_url) as response:
-                        text_log = await response.read()
-                        if search_term not in text_log.decode('utf-8').lower():
-                            continue
+    if search_term:
+        # Logs closed before the search index existed still have to be downloaded.
+        unindexed_urls = [txt_log_url for _, txt_log_url, _ in log_rows if txt_log_url not in indexed_urls]
+        if unindexed_urls:
+            # Performance: download the logs concurrently, a few at a time, instead of one after another.
+            download_limit = asyncio.Semaphore(8)
+
+            async def log_contains_term(txt_log_url):
+                async with download_limit:
+                    # Reuse the shared HTTP client's connection pool rather than opening a new session per search.
+                    # Performance: stream the log and stop at the first match instead of buffering the whole file.
+                    decoder = codecs.getincrementaldecoder('utf-8')('replace')
+                    tail = ''
+                    async with http_client.stream('GET', txt_log_url, timeout=30, follow_redirects=True) as response:
+                        async for chunk in response.aiter_bytes(65536):
+                            window = tail + decoder.decode(chunk).lower()
+                            if search_term in window:
+                                return True
+                            # Keep enough of the end to catch a match split across two chunks.
+                            tail = window[max(0, len(window) - len(search_term) + 1):]
+                    return search_term in tail + decoder.decode(b'', final=True).lower()
+
+            results = await asyncio.gather(*(log_contains_term(url) for url in unindexed_urls))
+            matched_urls.update(url for url, found in zip(unindexed_urls, results) if found)
+
+    for timestamp, txt_log_url, htm_log_url in log_rows:
+        if search_term and txt_log_url not in matched_urls:
+            continue
 
-                if len(embeds[-1].description) > 3900:
-                    embeds.append(embed_creator('', '', 'b'))
+        if description_length > 3900:
+            embeds.append(embed_creator('', '', 'b'))
+            description_parts.append([])
+            description_length = 0
 
-                embeds[-1].description += f'• <t:{int(timestamp)}:D> {htm_log_url}\n'
+        line = f'• <t:{int(timestamp)}:D> {htm_log_url}\n'
+        description_parts[-1].append(line)
+        description_length += len(line)
 
     if searching is not None:
         await searching.delete()
-    for embed in embeds:
+    for embed, parts in zip(embeds, description_parts):
+        embed.description = ''.join(parts)
         await ctx.send(embed=embed)
 
 
@@ -4199,9 +4704,7 @@ async def search(ctx, user: discord.User, *, search_term: str = ''):
 async def activetickets(ctx):
     """Shows the number of active tickets."""
 
-    with sqlite3.connect('tickets.db') as conn:
-        curs = conn.cursor()
-        total = curs.execute('SELECT COUNT(*) FROM tickets').fetchone()[0]
+    total = (await tickets_db.fetchone('SELECT COUNT(*) FROM tickets'))[0]
 
     await ctx.send(embed=embed_creator('Active Tickets', f'There are **{total}** active ticket(s).', 'g'))
 
@@ -4217,9 +4720,8 @@ async def ping(ctx):
 async def refresh(ctx):
     """Re-reads the external config file"""
 
-    with open('config.json', 'r') as file:
-
-        config.update(normalise_config_keys(json.load(file)))
+    config_data = await asyncio.to_thread(_read_json, 'config.json')
+    config.update(normalise_config_keys(config_data))
     await ctx.message.add_reaction('\u2705')
 
 
@@ -4270,7 +4772,7 @@ async def eval(ctx, *, body: str):
 async def on_thread_delete(thread):
     """Remove group tags when a ticket thread is removed."""
     if thread.parent_id in get_modmail_forum_ids():
-        remove_thread_from_groups(thread.id)
+        await remove_thread_from_groups(thread.id)
 
 
 bot.run(config.token, log_handler=None)